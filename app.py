@@ -7,8 +7,10 @@ from bsp_data import (
     PATH_GLOBAL_ENUMS,
     PATH_MASTER_LUA,
     PATH_MASTER_MISSION_TREE,
+    PATH_MASTER_UNITLIB,
 )
 from bsp_parser import BSPParser
+from bsp_selection import SelectionModel
 
 class App:
     def __init__(self, root):
@@ -20,6 +22,10 @@ class App:
         self.game_dir = tk.StringVar()
         self.all_missions = [] # Store all for filtering
         self.selected_missions = []
+        self.selection = None
+        self.minify_output = tk.BooleanVar(value=False)
+        self.trim_mission_tree = tk.BooleanVar(value=False)
+        self.field_dependencies = tk.BooleanVar(value=False)
 
         # --- Directory Selection ---
         tk.Label(root, text="Battlestations Pacific Directory:", font=('bold')).pack(pady=(10, 5))
@@ -63,6 +69,7 @@ class App:
         scrollbar = ttk.Scrollbar(left_frame, orient="vertical", command=self.tree.yview)
         self.tree.configure(yscrollcommand=scrollbar.set)
 
+        self.tree.tag_configure("missing_scene", foreground="#cc0000")
         self.tree.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
 
@@ -88,13 +95,23 @@ class App:
         sel_scrollbar = ttk.Scrollbar(right_frame, orient="vertical", command=self.selected_tree.yview)
         self.selected_tree.configure(yscrollcommand=sel_scrollbar.set)
 
+        self.selected_tree.tag_configure("missing_scene", foreground="#cc0000")
         self.selected_tree.pack(side="left", fill="both", expand=True)
         sel_scrollbar.pack(side="right", fill="y")
 
+        self.selection_stats_var = tk.StringVar()
+        tk.Label(root, textvariable=self.selection_stats_var, anchor="w").pack(fill="x", padx=10)
+
         # --- Action ---
         btn_frame = tk.Frame(root)
         btn_frame.pack(fill="x", padx=10, pady=10)
 
+        tk.Checkbutton(btn_frame, text="Minify output (strip comments and whitespace)", variable=self.minify_output).pack(anchor="w")
+        tk.Checkbutton(btn_frame, text="Trim missiontree.lua to the selected campaign missions", variable=self.trim_mission_tree).pack(anchor="w")
+        dep_frame = tk.Frame(btn_frame)
+        dep_frame.pack(fill="x")
+        tk.Checkbutton(dep_frame, text="Field-aware dependencies (only follow unit-referencing fields)", variable=self.field_dependencies, command=self.toggle_dependency_mode).pack(side="left")
+        tk.Button(dep_frame, text="Compare Dependencies", command=self.compare_dependencies).pack(side="right")
         tk.Button(btn_frame, text="GENERATE LOADER", command=self.generate, bg="#aaffaa", height=2).pack(fill="x")
         
         self.status_var = tk.StringVar()
@@ -125,6 +142,7 @@ class App:
         self.root.update()
 
         self.parser = BSPParser(gd)
+        self.parser.set_dependency_mode("fields" if self.field_dependencies.get() else "heuristic")
         
         # Load AlwaysInclude file (optional, won't fail if missing)
         res = self.parser.load_always_include(os.path.join(gd, PATH_ALWAYS_INCLUDE))
@@ -137,7 +155,7 @@ class App:
             messagebox.showerror("Error", res)
             return
         
-        path_unitlib = os.path.join(gd, "scripts", "datatables", "master_unitlib.lua")
+        path_unitlib = os.path.join(gd, PATH_MASTER_UNITLIB)
         
         # Load Master Classes
         res = self.parser.load_master_vehicle_classes(os.path.join(gd, PATH_MASTER_LUA))
@@ -159,7 +177,8 @@ class App:
             return
 
         self.all_missions = self.parser.missions
-        self.selected_missions = []
+        self.selection = SelectionModel(self.parser)
+        self.selected_missions = self.selection.missions
         self.refresh_selected_tree()
         
         # Setup Filter with proper grouping
@@ -174,7 +193,12 @@ class App:
         campaign_count = sum(1 for m in self.all_missions if m.group != "Multiplayer & Skirmish")
         mp_count = sum(1 for m in self.all_missions if m.group == "Multiplayer & Skirmish")
         
-        self.status_var.set(f"Status: Loaded {len(self.all_missions)} missions ({campaign_count} campaign, {mp_count} multiplayer) and {len(self.parser.master_units)} units.")
+        missing_count = sum(1 for m in self.all_missions if not m.scene_found)
+
+        status = f"Status: Loaded {len(self.all_missions)} missions ({campaign_count} campaign, {mp_count} multiplayer) and {len(self.parser.master_units)} units."
+        if missing_count:
+            status += f" {missing_count} mission(s) have missing scene files (shown in red)."
+        self.status_var.set(status)
 
     def apply_filter(self, event=None):
         selected_group = self.group_combo.get()
@@ -183,7 +207,10 @@ class App:
 
         for m in self.all_missions:
             if selected_group == "All Missions" or m.group == selected_group:
-                self.tree.insert("", "end", values=(m.id, m.name, m.group))
+                self.tree.insert("", "end", values=(m.id, m.name, m.group), tags=self._mission_tags(m))
+
+    def _mission_tags(self, mission):
+        return () if mission.scene_found else ("missing_scene",)
 
     def add_selection(self):
         if not self.parser:
@@ -200,8 +227,8 @@ class App:
             item = self.tree.item(item_id)
             mission_id = item['values'][0]
             mission = next((m for m in self.all_missions if m.id == str(mission_id)), None)
-            if mission and mission not in self.selected_missions:
-                self.selected_missions.append(mission)
+            if mission and mission not in self.selection:
+                self.selection.add(mission)
                 added += 1
 
         if added:
@@ -216,13 +243,48 @@ class App:
             return
 
         to_remove_ids = set(str(self.selected_tree.item(item)['values'][0]) for item in selected_items)
-        self.selected_missions = [m for m in self.selected_missions if str(m.id) not in to_remove_ids]
+        for m in [m for m in self.selected_missions if str(m.id) in to_remove_ids]:
+            self.selection.remove(m)
         self.refresh_selected_tree()
 
+    def toggle_dependency_mode(self):
+        if not self.parser:
+            return
+
+        self.parser.set_dependency_mode("fields" if self.field_dependencies.get() else "heuristic")
+
+        # Closures change with the mode, so rebuild the selection's unit union
+        missions = list(self.selected_missions)
+        self.selection = SelectionModel(self.parser)
+        self.selected_missions = self.selection.missions
+        for m in missions:
+            self.selection.add(m)
+        self.refresh_selected_tree()
+
+    def compare_dependencies(self):
+        if not self.parser:
+            messagebox.showwarning("Warning", "Please load game data first.")
+            return
+
+        if not self.selected_missions:
+            messagebox.showwarning("Warning", "Please add missions to the selection list first.")
+            return
+
+        res = self.parser.compare_dependency_modes(self.selected_missions)
+        if "Error" in res:
+            messagebox.showerror("Failed", res)
+        else:
+            messagebox.showinfo("Dependency Comparison", res)
+
     def refresh_selected_tree(self):
         self.selected_tree.delete(*self.selected_tree.get_children())
         for m in self.selected_missions:
-            self.selected_tree.insert("", "end", values=(m.id, m.name, m.group))
+            self.selected_tree.insert("", "end", values=(m.id, m.name, m.group), tags=self._mission_tags(m))
+
+        if self.selection:
+            self.selection_stats_var.set(f"Selection: {self.selection.summary()}")
+        else:
+            self.selection_stats_var.set("")
 
     def generate(self):
         if not self.parser:
@@ -243,8 +305,8 @@ class App:
             ),
             None,
         )
-        if dreadnought and dreadnought not in self.selected_missions:
-            self.selected_missions.append(dreadnought)
+        if dreadnought and dreadnought not in self.selection:
+            self.selection.add(dreadnought)
             self.refresh_selected_tree()
             messagebox.showinfo(
                 "Dreadnought Added",
@@ -259,7 +321,11 @@ class App:
             if not proceed:
                 return
 
-        res = self.parser.generate_for_missions(self.selected_missions)
+        res = self.parser.generate_for_missions(
+            self.selected_missions,
+            minify=self.minify_output.get(),
+            trim_mission_tree=self.trim_mission_tree.get(),
+        )
         if "Error" in res:
             messagebox.showerror("Failed", res)
         else:
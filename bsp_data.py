@@ -8,6 +8,7 @@ class MissionDef:
         self.scn_path = scn_path
         self.group = group
         self.raw_block = raw_block
+        self.scene_found = True # Cleared by load_missions when the SCN is missing
 
 class UnitDef:
     def __init__(self, unit_id, name, code, unit_type, lua_content):
@@ -20,6 +21,12 @@ class UnitDef:
 # Common paths relative to the Game Root
 PATH_MASTER_LUA = os.path.join("scripts", "datatables", "autoload", "Master_vehicleclasses.lua")
 PATH_MISSION_TREE = os.path.join("scripts", "datatables", "missiontree.lua")
+PATH_VEHICLECLASS = os.path.join("scripts", "datatables", "autoload", "VehicleClass.lua")
+PATH_UNITLIB = os.path.join("scripts", "datatables", "UnitLib.lua")
 PATH_MASTER_MISSION_TREE = os.path.join("scripts", "datatables", "master_missiontree.lua")
+PATH_MASTER_UNITLIB = os.path.join("scripts", "datatables", "master_unitlib.lua")
 PATH_GLOBAL_ENUMS = os.path.join("universe", "library", "global.enums")
-PATH_ALWAYS_INCLUDE = os.path.join("scripts", "datatables", "autoload", "AlwaysInclude_vehicleclasses.lua")
\ No newline at end of file
+PATH_ALWAYS_INCLUDE = os.path.join("scripts", "datatables", "autoload", "AlwaysInclude_vehicleclasses.lua")
+
+# Files written by a generate, relative to the output root
+OUTPUT_PATHS = (PATH_VEHICLECLASS, PATH_UNITLIB, PATH_MISSION_TREE)
@@ -0,0 +1,229 @@
+# bsp_delta.py
+"""Block-level delta patches between two generated loader sets.
+
+Usage:
+    python bsp_delta.py make OLD_DIR NEW_DIR PATCH_FILE
+    python bsp_delta.py apply OLD_DIR PATCH_FILE OUT_DIR
+
+OLD_DIR / NEW_DIR / OUT_DIR use the game directory layout (the files in
+bsp_data.OUTPUT_PATHS). OUT_DIR may be OLD_DIR to update a client in place.
+"""
+import difflib
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+import zlib
+
+from bsp_data import OUTPUT_PATHS
+
+PATCH_MAGIC = b"BSPDELTA1"
+
+# Generated files are concatenations of known blocks: VehicleClass[...]
+# definitions, UnitLib entries/groups and mission blocks, separated by blank
+# lines or starting on a line of their own. Splitting at those points keeps
+# block boundaries stable between versions (including minified output, where
+# the VehicleClass / UnitLib entry markers are all that is left).
+_BLOCK_BOUNDARY = re.compile(
+    rb'(?<=\n\n)'
+    rb'|(?<=\n)(?=[ \t]*\{)'
+    rb'|(?=VehicleClass\s*\[)'
+    rb'|(?=\{\s*\[\s*"VehicleClass"\s*\])'
+)
+
+
+def split_blocks(data):
+    return [block for block in _BLOCK_BOUNDARY.split(data) if block]
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _read(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return b""
+
+
+def _diff_file(old, new, payload):
+    """Returns copy/data ops rebuilding `new` from `old`, appending literal
+    bytes to payload."""
+    old_blocks = split_blocks(old)
+    new_blocks = split_blocks(new)
+
+    old_offsets = [0]
+    for block in old_blocks:
+        old_offsets.append(old_offsets[-1] + len(block))
+
+    ops = []
+    matcher = difflib.SequenceMatcher(None, old_blocks, new_blocks, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            start, length = old_offsets[i1], old_offsets[i2] - old_offsets[i1]
+            if ops and ops[-1][0] == "c" and ops[-1][1] + ops[-1][2] == start:
+                ops[-1][2] += length
+            else:
+                ops.append(["c", start, length])
+        elif tag in ("replace", "insert"):
+            literal = b"".join(new_blocks[j1:j2])
+            ops.append(["d", len(payload), len(literal)])
+            payload.extend(literal)
+    return ops
+
+
+def _patch_key(rel_path):
+    return os.path.normpath(rel_path.replace("\\", "/")).replace(os.sep, "/")
+
+
+_PATCHABLE = {_patch_key(rel_path): rel_path for rel_path in OUTPUT_PATHS}
+
+
+def _check_entry(entry, payload_len):
+    """Returns the local path for a header file entry, or an error naming
+    what is wrong with it. Only the loader files in OUTPUT_PATHS may be
+    written, whatever the patch says."""
+    if not isinstance(entry, dict):
+        return None, "file entry is not an object"
+    for key in ("path", "old_sha256", "new_sha256"):
+        if not isinstance(entry.get(key), str):
+            return None, f"file entry has no {key}"
+
+    rel_path = _PATCHABLE.get(_patch_key(entry["path"]))
+    if rel_path is None:
+        return None, f"{entry['path']!r} is not a loader file"
+
+    ops = entry.get("ops")
+    if not isinstance(ops, list):
+        return None, f"{rel_path} has no ops"
+    for op in ops:
+        if (not isinstance(op, list) or len(op) != 3 or op[0] not in ("c", "d")
+                or not all(type(n) is int and n >= 0 for n in op[1:])):
+            return None, f"{rel_path} has a malformed op {op!r}"
+        if op[0] == "d" and op[1] + op[2] > payload_len:
+            return None, f"{rel_path} reads past the end of the payload"
+    return rel_path, None
+
+
+def make_delta(old_dir, new_dir):
+    """Builds a patch turning old_dir's loader set into new_dir's.
+
+    Returns (patch_bytes, error).
+    """
+    files = []
+    payload = bytearray()
+
+    for rel_path in OUTPUT_PATHS:
+        new_path = os.path.join(new_dir, rel_path)
+        if not os.path.exists(new_path):
+            return None, f"Error: {new_path} not found"
+
+        old = _read(os.path.join(old_dir, rel_path))
+        new = _read(new_path)
+        files.append({
+            "path": rel_path.replace(os.sep, "/"),
+            "old_sha256": _sha256(old),
+            "new_sha256": _sha256(new),
+            "ops": _diff_file(old, new, payload),
+        })
+
+    header = json.dumps({"files": files}, separators=(",", ":")).encode("utf-8")
+    body = struct.pack(">I", len(header)) + header + bytes(payload)
+    return PATCH_MAGIC + zlib.compress(body, 9), None
+
+
+def apply_delta(old_dir, patch, out_dir):
+    """Rebuilds the new loader set from old_dir and a patch into out_dir.
+
+    The header is validated first and only the files in OUTPUT_PATHS can be
+    targeted. Every input is checked against the hash recorded in the patch
+    and every output against the new hash before anything is written; files
+    are then written to temporaries and renamed into place.
+    """
+    if not patch.startswith(PATCH_MAGIC):
+        return "Error: Not a loader delta patch"
+
+    try:
+        body = zlib.decompress(patch[len(PATCH_MAGIC):])
+        (header_len,) = struct.unpack(">I", body[:4])
+        header = json.loads(body[4:4 + header_len])
+    except (zlib.error, struct.error, ValueError) as e:
+        return f"Error: Corrupt patch: {e}"
+    payload = memoryview(body)[4 + header_len:]
+
+    files = header.get("files") if isinstance(header, dict) else None
+    if not isinstance(files, list):
+        return "Error: Corrupt patch: header has no file list"
+    entries = []
+    for entry in files:
+        rel_path, err = _check_entry(entry, len(payload))
+        if err:
+            return f"Error: Corrupt patch: {err}"
+        entries.append((rel_path, entry))
+
+    rebuilt = []
+    for rel_path, entry in entries:
+        old = _read(os.path.join(old_dir, rel_path))
+        old_hash = _sha256(old)
+        if old_hash == entry["new_sha256"]:
+            # Already at the target version (e.g. the patch was applied before)
+            rebuilt.append((os.path.join(out_dir, rel_path), old))
+            continue
+        if old_hash != entry["old_sha256"]:
+            return f"Error: {rel_path} does not match the patch's base version"
+
+        parts = []
+        for kind, offset, length in entry["ops"]:
+            if kind == "c" and offset + length > len(old):
+                return f"Error: Corrupt patch: {rel_path} copies past the end of the old file"
+            source = old if kind == "c" else payload
+            parts.append(bytes(source[offset:offset + length]))
+        new = b"".join(parts)
+
+        if _sha256(new) != entry["new_sha256"]:
+            return f"Error: {rel_path} hash mismatch after applying patch"
+        rebuilt.append((os.path.join(out_dir, rel_path), new))
+
+    try:
+        for path, data in rebuilt:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + ".patching", 'wb') as f:
+                f.write(data)
+        for path, _ in rebuilt:
+            os.replace(path + ".patching", path)
+    except Exception as e:
+        return f"Error writing Output: {e}"
+
+    return f"Success! Patched {len(rebuilt)} file(s)"
+
+
+def main(argv):
+    if len(argv) == 4 and argv[0] == "make":
+        old_dir, new_dir, patch_path = argv[1:]
+        patch, err = make_delta(old_dir, new_dir)
+        if err:
+            print(err)
+            return 1
+        with open(patch_path, 'wb') as f:
+            f.write(patch)
+        full_size = sum(os.path.getsize(os.path.join(new_dir, p)) for p in OUTPUT_PATHS)
+        print(f"Wrote {patch_path}: {len(patch)} bytes (full set: {full_size} bytes)")
+        return 0
+
+    if len(argv) == 4 and argv[0] == "apply":
+        old_dir, patch_path, out_dir = argv[1:]
+        with open(patch_path, 'rb') as f:
+            res = apply_delta(old_dir, f.read(), out_dir)
+        print(res)
+        return 0 if res.startswith("Success") else 1
+
+    print(__doc__.strip())
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
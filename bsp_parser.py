@@ -1,25 +1,80 @@
 # bsp_parser.py
 import re
 import os
-from bsp_data import UnitDef, MissionDef
-
-# 1. SCANNED OBJECTS TO IGNORE (SCN Parsing)
-IGNORED_SCN_CLASSES = {
-    "PlaneCount", "MaxSquadSize", "Races", "Party", 
-    "CommandType", "AttackMode", "FormationType", "MoveType",
-    "MissionObjectives", "WeatherTypes", "mission_objectives",
-    "RelationTypes", "NavpointType", "UnitType", "SpawnType",
-    "WingCount", "AILevel", "LandingType", "InputId",
-    "mission_objs", "CamState", "MusicType", "MovieType",
-    "FlightDeckType", "HangarType", "GunType", "AmmoType"
-}
+import mmap
+from bsp_data import UnitDef, MissionDef, PATH_MISSION_TREE, PATH_UNITLIB, PATH_VEHICLECLASS
+from bsp_scenes import SceneIndex, find_path_ignoring_case
+from lua_minify import minify as minify_lua, is_token_equivalent, tokenize as tokenize_lua, LuaTokenError
 
-# 2. ALWAYS INCLUDE THESE ENUMS
+# 1. ALWAYS INCLUDE THESE ENUMS
 # These are the only specific enums we scan the SCN for.
 ALWAYS_INCLUDE_ENUMS = {
     "PlaneClasses", "ShipClasses", "VehicleClasses"
 }
 
+# 2. VEHICLECLASS FIELDS THAT REFERENCE OTHER UNITS
+# Used by the "fields" dependency mode. Each rule is a case-insensitive regex
+# searched in the field name; a quoted code counts as a dependency only if it
+# sits under (at any depth) a field matching one of these rules. Override with
+# BSPParser.load_dependency_rules() for mods that use other field names.
+DEPENDENCY_FIELD_RULES = (
+    r"weapon", r"plane", r"escort", r"launch", r"torpedo", r"bomb",
+    r"rocket", r"missile", r"squad", r"wing", r"carried", r"spawn",
+    r"support", r"aircraft", r"subunit", r"turret",
+)
+
+DEPENDENCY_MODES = ("heuristic", "fields")
+
+# Matches `Type = E <Class> : <Code>` directly on the raw SCN bytes, limited to
+# the enums we care about so unrelated objects are skipped by the regex engine.
+# Every other enum class in a scene (PlaneCount, AILevel, CommandType,
+# FlightDeckType, ...) simply never matches, so no ignore list is needed.
+SCN_UNIT_PATTERN = re.compile(
+    rb'Type\s*=\s*E\s+('
+    + b'|'.join(re.escape(name.encode('latin-1')) for name in sorted(ALWAYS_INCLUDE_ENUMS))
+    + rb')\s*:\s*([a-zA-Z0-9_-]+)'
+)
+
+def _render(text):
+    """Encodes output text exactly as the text-mode writer used to: UTF-8 with
+    platform line endings."""
+    if os.linesep != "\n":
+        text = text.replace("\n", os.linesep)
+    return text.encode('utf-8')
+
+
+def render_unitlib_fragments(unitlib_groups):
+    """Pre-renders every UnitLib group opening and entry (stripped, with a
+    trailing comma) and indexes entries by VehicleClass ID.
+
+    Returns (fragments, index): per group (rendered opening, [rendered
+    entries]), and VehicleClass ID -> [(group index, entry position)].
+    """
+    fragments = []
+    index = {}
+
+    for group_idx, group in enumerate(unitlib_groups):
+        opening = "{\n"
+        if group["header"]:
+            opening += group["header"].rstrip() + "\n"
+
+        entries = []
+        for pos, (vc_id, entry) in enumerate(group["entries"]):
+            entry_clean = entry.strip()
+            suffix = "" if entry_clean.endswith(",") else ","
+            entries.append(_render(entry_clean + suffix))
+            index.setdefault(vc_id, []).append((group_idx, pos))
+
+        fragments.append((_render(opening), entries))
+    return fragments, index
+
+
+# Separators between pre-rendered output fragments
+BLOCK_SEP = _render("\n\n")
+GROUP_CLOSE = _render("\n},\n")
+UNITLIB_CLOSE = b"}"
+
+
 MASTER_TREE_PREAMBLE = """DoFile(\"scripts/datatables/MultiGlobals.lua\")
 function luaOverrideMultiLobbySettings(overrideTable)
     --overrideTabla formatuma meg kell egyezzen a MultiGlobals.lua MultiLobbySettings tabla szerkezetevel. Csak a MenuDIS parameter updatelodik!
@@ -88,7 +143,14 @@ class BSPParser:
         self.master_unitlib = {} # Stores UnitLib content mapped by VehicleClass ID
         self.unitlib_groups = [] # Preserves group ordering and metadata from Master_unitlib
         self.unitlib_header = "" # Stores the top part of UnitLib (Global vars)
+        # Output fragments rendered to bytes at load time so a generate only
+        # concatenates the pieces it needs
+        self.vc_fragments = {} # VehicleClass ID -> rendered VehicleClass block
+        self.unitlib_fragments = [] # Per group: (rendered group opening, [rendered entries])
+        self.unitlib_index = {} # VehicleClass ID -> [(group index, entry position)]
         self.missions = []
+        self.scene_index = None
+        self.late_scenes = {} # Scene paths missing at load time -> real path once they appear
         self.non_unit_lua = []
         self.always_include_lua = ""
         self.always_include_ids = set()
@@ -96,6 +158,12 @@ class BSPParser:
         self.mission_groups_raw = ""
         self.multi_template = {"prefix": "", "suffix": ""}
         self.multi_block_raw = ""
+        # Per-mission closures keyed by SCN path, invalidated by mtime/size
+        self.closure_cache = {}
+        self.dependency_mode = "heuristic"
+        self.dependency_rules = DEPENDENCY_FIELD_RULES
+        self._dependency_field_re = re.compile("|".join(DEPENDENCY_FIELD_RULES), re.IGNORECASE)
+        self.dependency_cache = {}
 
     def _normalize_scene_path(self, raw_scene: str) -> str:
         """Cleans a raw scene path coming from missiontree.lua definitions.
@@ -144,6 +212,8 @@ class BSPParser:
     def load_global_enums(self, path):
         """Parses global.enums to map unit code names to IDs."""
         print("Loading Enums...")
+        self.closure_cache = {}
+        self.dependency_cache = {}
         try:
             with open(path, 'r', encoding='latin-1') as f:
                 content = f.read()
@@ -164,6 +234,9 @@ class BSPParser:
     def load_master_vehicle_classes(self, path):
         """Parses Master_vehicleclasses.lua."""
         print("Loading Master Vehicle Classes...")
+        self.closure_cache = {}
+        self.dependency_cache = {}
+        self.vc_fragments = {}
         try:
             with open(path, 'r', encoding='latin-1') as f:
                 content = f.read()
@@ -198,6 +271,7 @@ class BSPParser:
                 code = code_match.group(1) if code_match else "Unknown"
                 
                 self.master_units[unit_id] = UnitDef(unit_id, code, code, "Unknown", full_lua)
+                self.vc_fragments[unit_id] = _render(full_lua)
 
         except Exception as e:
             return f"Error parsing Master Vehicle Classes: {e}"
@@ -215,6 +289,8 @@ class BSPParser:
 
             self.master_unitlib = {}
             self.unitlib_groups = []
+            self.unitlib_fragments = []
+            self.unitlib_index = {}
 
             # Capture header (UnitLib = {})
             first_brace = content.find('{')
@@ -291,12 +367,17 @@ class BSPParser:
                         "entries": stored_entries,
                     })
 
+            self._render_unitlib_fragments()
+
             print(f"Loaded UnitLib data for {len(self.master_unitlib)} unique VehicleClass IDs")
 
         except Exception as e:
             return f"Error loading Master UnitLib: {e}"
         return "Success"
 
+    def _render_unitlib_fragments(self):
+        self.unitlib_fragments, self.unitlib_index = render_unitlib_fragments(self.unitlib_groups)
+
     def _extract_block(self, content: str, start_idx: int) -> str:
         """Extracts a brace-delimited block starting at start_idx."""
         if start_idx < 0 or start_idx >= len(content) or content[start_idx] != '{':
@@ -368,8 +449,10 @@ class BSPParser:
                 missions_block_start = group_block.find('{', missions_key_idx)
                 missions_block = self._extract_block(group_block, missions_block_start)
 
+                # Like multi_template, the suffix keeps the missions table's
+                # closing brace so a rebuilt group is balanced.
                 prefix = group_block[:missions_block_start + 1]
-                suffix = group_block[missions_block_start + len(missions_block):]
+                suffix = group_block[missions_block_start + len(missions_block) - 1:]
                 self.group_templates[group_name] = {"prefix": prefix, "suffix": suffix}
 
                 for mission_block in self._extract_blocks(missions_block[1:-1]):
@@ -415,11 +498,70 @@ class BSPParser:
                     full_scene_path = os.path.join("universe", "Scenes", "missions", raw_scene.replace('/', os.sep))
                     self.missions.append(MissionDef(m_id, m_name, full_scene_path, "Multiplayer & Skirmish", mission_block))
 
+            self._resolve_scene_paths()
+
         except Exception as e:
             return f"Error loading Mission Tree: {e}"
         return "Success"
 
-    def _find_dependencies(self, lua_content):
+    def _resolve_scene_paths(self):
+        """Maps every mission's scene path onto the real file, ignoring case,
+        and flags missions whose scene does not exist."""
+        self.scene_index = SceneIndex(self.root)
+        missing = 0
+        for mission in self.missions:
+            actual = self.scene_index.resolve(mission.scn_path)
+            if actual:
+                mission.scn_path = actual
+                mission.scene_found = True
+            else:
+                mission.scene_found = False
+                missing += 1
+
+        print(f"Indexed {len(self.scene_index)} scene files ({missing} missions with missing scenes)")
+
+    def set_dependency_mode(self, mode, rules=None):
+        """Selects how VehicleClass dependencies are extracted.
+
+        "heuristic" treats every quoted enum name in a block as a dependency.
+        "fields" only follows quoted codes under fields matching `rules`
+        (defaults to the currently loaded rules).
+        """
+        if mode not in DEPENDENCY_MODES:
+            return f"Error: Unknown dependency mode {mode!r}"
+        if rules is not None:
+            rules = tuple(rules)
+            if not rules:
+                return "Error: No dependency field rules given"
+            try:
+                field_re = re.compile("|".join(rules), re.IGNORECASE)
+            except re.error as e:
+                return f"Error: Invalid dependency field rule: {e}"
+            self.dependency_rules = rules
+            self._dependency_field_re = field_re
+
+        self.dependency_mode = mode
+        self.closure_cache = {}
+        self.dependency_cache = {}
+        return "Success"
+
+    def load_dependency_rules(self, path):
+        """Loads field rules from a text file, one regex per line (# comments)."""
+        try:
+            with open(path, 'r', encoding='latin-1') as f:
+                rules = [line.strip() for line in f]
+        except Exception as e:
+            return f"Error loading dependency rules: {e}"
+        rules = [rule for rule in rules if rule and not rule.startswith('#')]
+        return self.set_dependency_mode(self.dependency_mode, rules)
+
+    def _find_dependencies(self, lua_content, mode=None):
+        if (mode or self.dependency_mode) == "fields":
+            try:
+                return self._find_field_dependencies(lua_content)
+            except LuaTokenError:
+                pass
+
         found_ids = set()
         potential_codes = re.findall(r'"([a-zA-Z0-9_]+)"', lua_content)
         for code in potential_codes:
@@ -427,58 +569,274 @@ class BSPParser:
                 found_ids.add(self.enums[code])
         return found_ids
 
-    def _collect_required_ids(self, mission_def: MissionDef):
-        scn_full_path = os.path.join(self.root, mission_def.scn_path)
-        if not os.path.exists(scn_full_path):
-            return None, f"Error: SCN file not found at {scn_full_path}"
+    def _find_field_dependencies(self, lua_content):
+        """Collects enum codes that are values of unit-referencing fields.
 
-        required_ids = set()
+        Walks the Lua tokens with a stack of table keys, so comments and long
+        strings are never seen and a code only counts when it sits under a
+        field matching the dependency rules.
+        """
+        found_ids = set()
+        tokens = tokenize_lua(lua_content)
+        field_re = self._dependency_field_re
+        key_stack = []
+        pending_key = None
 
-        try:
-            with open(scn_full_path, 'r', encoding='latin-1') as f:
-                content = f.read()
+        idx = 0
+        count = len(tokens)
+        while idx < count:
+            tok = tokens[idx]
+
+            # ["Key"] = ...
+            if (tok == "[" and idx + 3 < count and tokens[idx + 1][:1] in "\"'"
+                    and tokens[idx + 2] == "]" and tokens[idx + 3] == "="):
+                pending_key = tokens[idx + 1][1:-1]
+                idx += 4
+                continue
 
-            matches = re.findall(r'Type\s*=\s*E\s+([a-zA-Z0-9_]+)\s*:\s*([a-zA-Z0-9_-]+)', content)
+            # Key = ...
+            if (tok[:1].isalpha() or tok[:1] == "_") and idx + 1 < count and tokens[idx + 1] == "=":
+                pending_key = tok
+                idx += 2
+                continue
 
-            for class_type, code in matches:
-                if class_type in IGNORED_SCN_CLASSES:
-                    continue
-                if class_type not in ALWAYS_INCLUDE_ENUMS:
-                    continue
+            if tok == "{":
+                key_stack.append(pending_key)
+                pending_key = None
+            elif tok == "}":
+                if key_stack:
+                    key_stack.pop()
+                pending_key = None
+            elif tok in (",", ";"):
+                pending_key = None
+            elif tok[:1] in "\"'":
+                code = tok[1:-1]
+                if code in self.enums and any(
+                    key and field_re.search(key) for key in (pending_key, *key_stack)
+                ):
+                    found_ids.add(self.enums[code])
+            idx += 1
+
+        return found_ids
+
+    def _unit_dependencies(self, unit_id):
+        deps = self.dependency_cache.get(unit_id)
+        if deps is None:
+            deps = frozenset(self._find_dependencies(self.master_units[unit_id].lua_content))
+            self.dependency_cache[unit_id] = deps
+        return deps
+
+    def _scan_scn_unit_ids(self, scn_full_path):
+        """Returns the unit IDs referenced by an SCN file.
+
+        The file is memory-mapped and matched with a bytes regex, so only the
+        captured code tokens are ever decoded and peak memory does not grow with
+        the scene size.
+        """
+        unit_ids = set()
+        seen_codes = set()
+
+        with open(scn_full_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return unit_ids
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                for match in SCN_UNIT_PATTERN.finditer(buf):
+                    raw_code = match.group(2)
+                    if raw_code in seen_codes:
+                        continue
+                    seen_codes.add(raw_code)
+
+                    unit_id = self.enums.get(raw_code.decode('latin-1'))
+                    if unit_id is not None:
+                        unit_ids.add(unit_id)
 
-                if code in self.enums:
-                    unit_id = self.enums[code]
-                    required_ids.add(unit_id)
+        return unit_ids
+
+    def _scene_full_path(self, mission_def):
+        """Returns (full SCN path, error) for a mission.
+
+        A scene that was missing when the missions were loaded is looked up on
+        disk again, so a scene added later (e.g. while the service runs) is
+        found without a reload.
+        """
+        scn_path = mission_def.scn_path
+        if not mission_def.scene_found:
+            actual = self.late_scenes.get(scn_path)
+            if actual is None:
+                actual = find_path_ignoring_case(self.root, scn_path)
+                if actual is None:
+                    return None, f"Error: SCN file not found at {os.path.join(self.root, scn_path)}"
+                self.late_scenes[scn_path] = actual
+            scn_path = actual
+        return os.path.join(self.root, scn_path), None
+
+    def _collect_required_ids(self, mission_def: MissionDef):
+        """Returns (unit_ids, error) for everything a mission needs.
+
+        Results are cached per scene file and reused until the file's mtime or
+        size changes, so repeated selections and generates skip the SCN scan.
+        """
+        scn_full_path, err = self._scene_full_path(mission_def)
+        if err:
+            return None, err
+        try:
+            st = os.stat(scn_full_path)
+        except OSError:
+            return None, f"Error: SCN file not found at {scn_full_path}"
+
+        stamp = (st.st_mtime_ns, st.st_size)
+        cached = self.closure_cache.get(scn_full_path)
+        if cached and cached[0] == stamp:
+            return cached[1], None
+
+        try:
+            required_ids = self._scan_scn_unit_ids(scn_full_path)
         except Exception as e:
             return None, f"Error parsing SCN: {e}"
 
+        required_ids = frozenset(self._expand_dependencies(required_ids, self._unit_dependencies))
+        self.closure_cache[scn_full_path] = (stamp, required_ids)
+        return required_ids, None
+
+    def _expand_dependencies(self, required_ids, get_dependencies):
+        """Adds the transitive VehicleClass dependencies to required_ids."""
+        required_ids = set(required_ids)
         ids_to_process = list(required_ids)
-        processed_ids = set()
 
         while ids_to_process:
-            current_id = ids_to_process.pop(0)
-            if current_id in processed_ids:
+            current_id = ids_to_process.pop()
+            if current_id not in self.master_units:
                 continue
-            processed_ids.add(current_id)
 
-            if current_id in self.master_units:
-                unit_lua = self.master_units[current_id].lua_content
-                dependencies = self._find_dependencies(unit_lua)
+            for dep_id in get_dependencies(current_id):
+                if dep_id not in required_ids:
+                    required_ids.add(dep_id)
+                    ids_to_process.append(dep_id)
 
-                for dep_id in dependencies:
-                    if dep_id not in required_ids:
-                        required_ids.add(dep_id)
-                        ids_to_process.append(dep_id)
+        return required_ids
 
-        return required_ids, None
+    def _estimate_output(self, mission_list, unit_ids):
+        """Returns (VehicleClass units, UnitLib entries, bytes) a default
+        generate of mission_list would produce with unit_ids as its closure."""
+        size = OutputSizeTracker(self)
+        for mission_def in mission_list:
+            size.add_mission(mission_def)
+        for uid in unit_ids:
+            size.add_unit(uid)
+        return size.vc_units, size.ul_entries, size.total_bytes
 
-    def generate_mission_loader(self, mission_def):
-        return self.generate_for_missions([mission_def])
+    def compare_dependency_modes(self, mission_list):
+        """Reports closure and output size under both dependency modes."""
+        if not mission_list:
+            return "Error: No missions provided"
 
-    def generate_for_missions(self, mission_list):
+        roots = set()
+        for mission_def in mission_list:
+            scn_full_path, err = self._scene_full_path(mission_def)
+            if err:
+                return err
+            try:
+                roots.update(self._scan_scn_unit_ids(scn_full_path))
+            except Exception as e:
+                return f"Error parsing SCN: {e}"
+
+        results = {}
+        for mode in DEPENDENCY_MODES:
+            mode_cache = {}
+
+            def get_dependencies(unit_id, mode=mode, mode_cache=mode_cache):
+                if unit_id not in mode_cache:
+                    mode_cache[unit_id] = self._find_dependencies(self.master_units[unit_id].lua_content, mode)
+                return mode_cache[unit_id]
+
+            closure = self._expand_dependencies(roots, get_dependencies)
+            results[mode] = (len(closure),) + self._estimate_output(mission_list, closure)
+
+        lines = ["Dependency extraction comparison:"]
+        for mode in DEPENDENCY_MODES:
+            closure_size, vc_units, ul_entries, size = results[mode]
+            lines.append(
+                f"{mode}: {closure_size} IDs in closure, {vc_units} VehicleClass units, "
+                f"{ul_entries} UnitLib entries, {size} bytes of output"
+            )
+
+        before, after = results["heuristic"], results["fields"]
+        saved_ids = before[0] - after[0]
+        saved_bytes = before[3] - after[3]
+        percent = (saved_bytes * 100.0 / before[3]) if before[3] else 0.0
+        lines.append(f"Field-aware saves {saved_ids} IDs and {saved_bytes} bytes ({percent:.1f}%)")
+        return "\n".join(lines)
+
+    def _mission_label(self, mission_list):
+        return ", ".join(m.name for m in mission_list)
+
+    def _vc_head(self, mission_label):
+        """Rendered VehicleClass.lua text preceding the mission units."""
+        vc_head = ["VehicleClass = {}", f"-- Mission: {mission_label}"]
+        if self.always_include_lua:
+            vc_head.append("\n-- Always Include:")
+            vc_head.append(self.always_include_lua)
+        vc_head.append("\n-- Global Logic:")
+        vc_head.extend(self.non_unit_lua)
+        vc_head.append("\n-- Mission Units:")
+        return _render("\n\n".join(vc_head))
+
+    def _ul_head(self, mission_label):
+        """Rendered UnitLib.lua text preceding the first group."""
+        # Use captured header or default
+        ul_head = self.unitlib_header.strip() if self.unitlib_header else "UnitLib = {"
+        return _render(f"{ul_head}\n-- Filtered UnitLib for Mission: {mission_label}\n")
+
+    def _emits_vehicleclass(self, uid):
+        """True if a required unit gets its own block in VehicleClass.lua."""
+        return uid > 1 and uid not in self.always_include_ids and uid in self.master_units
+
+    def _vc_fragment(self, uid):
+        fragment = self.vc_fragments.get(uid)
+        if fragment is None:
+            fragment = _render(self.master_units[uid].lua_content)
+        return fragment
+
+    def generate_mission_loader(self, mission_def, minify=False, output_root=None, trim_mission_tree=False):
+        return self.generate_for_missions(
+            [mission_def], minify=minify, output_root=output_root, trim_mission_tree=trim_mission_tree
+        )
+
+    def _minify_outputs(self, outputs):
+        """Minifies each (label, text) pair in place.
+
+        Returns a list of report lines, or an error string if any minified file
+        does not tokenize to the same stream as its unminified source.
+        """
+        report = []
+        for idx, (label, text) in enumerate(outputs):
+            try:
+                minified = minify_lua(text)
+            except ValueError as e:
+                return f"Error minifying {label}: {e}"
+            if not is_token_equivalent(text, minified):
+                return f"Error minifying {label}: output is not token-equivalent"
+
+            before = len(text.encode('utf-8'))
+            after = len(minified.encode('utf-8'))
+            saved = before - after
+            percent = (saved * 100.0 / before) if before else 0.0
+            report.append(f"{label}: {before} -> {after} bytes (-{saved}, {percent:.1f}%)")
+            outputs[idx] = (label, minified)
+        return report
+
+    def generate_for_missions(self, mission_list, minify=False, output_root=None, trim_mission_tree=False):
+        """Writes VehicleClass.lua, UnitLib.lua and missiontree.lua.
+
+        Files go under output_root (same layout as the game directory), which
+        defaults to the game root itself. With trim_mission_tree, missiontree.lua
+        only lists the selected single-player groups and missions.
+        """
         if not mission_list:
             return "Error: No missions provided"
 
+        out_root = output_root or self.root
+
         combined_ids = set()
         for mission_def in mission_list:
             mission_ids, err = self._collect_required_ids(mission_def)
@@ -486,110 +844,151 @@ class BSPParser:
                 return err
             combined_ids.update(mission_ids)
 
-        mission_label = ", ".join(m.name for m in mission_list)
-
-        vc_lines = []
-        vc_lines.append("VehicleClass = {}")
-        vc_lines.append(f"-- Mission: {mission_label}")
-
-        if self.always_include_lua:
-            vc_lines.append("\n-- Always Include:")
-            vc_lines.append(self.always_include_lua)
-
-        vc_lines.append("\n-- Global Logic:")
-        vc_lines.extend(self.non_unit_lua)
+        mission_label = self._mission_label(mission_list)
 
-        vc_lines.append("\n-- Mission Units:")
+        # --- VehicleClass.lua: static head, then one pre-rendered block per unit ---
+        vc_fragments = [self._vc_head(mission_label)]
         vc_write_count = 0
 
         for uid in sorted(combined_ids):
-            if uid <= 1:
-                continue
-            if uid in self.always_include_ids:
-                continue
-
-            if uid in self.master_units:
-                vc_lines.append(self.master_units[uid].lua_content)
+            if self._emits_vehicleclass(uid):
+                vc_fragments.append(BLOCK_SEP)
+                vc_fragments.append(self._vc_fragment(uid))
                 vc_write_count += 1
 
-        vc_path = os.path.join(self.root, "scripts", "datatables", "autoload", "VehicleClass.lua")
-        
-        # --- 4. WRITE UnitLib.lua ---
-        ul_lines = []
-        # Use captured header or default
-        ul_lines.append(self.unitlib_header.strip() if self.unitlib_header else "UnitLib = {")
-        ul_lines.append(f"-- Filtered UnitLib for Mission: {mission_label}")
+        vc_path = os.path.join(out_root, PATH_VEHICLECLASS)
 
-        ul_write_count = 0
+        # --- UnitLib.lua: only the indexed entries of the needed IDs ---
+        ul_fragments = [self._ul_head(mission_label)]
 
         # Combine AlwaysInclude IDs + Mission Required IDs for UnitLib
-        all_needed_ids = combined_ids.union(self.always_include_ids)
-
-        for group in self.unitlib_groups:
-            filtered_entries = [(vc_id, block) for vc_id, block in group["entries"] if vc_id in all_needed_ids]
-            if not filtered_entries:
-                continue
+        needed_positions = {}
+        for vc_id in combined_ids.union(self.always_include_ids):
+            for group_idx, pos in self.unitlib_index.get(vc_id, ()):
+                needed_positions.setdefault(group_idx, []).append(pos)
 
-            ul_lines.append("{")
-            if group["header"]:
-                ul_lines.append(group["header"].rstrip())
-
-            for idx, (_, entry) in enumerate(filtered_entries):
-                entry_clean = entry.strip()
-                needs_comma = not entry_clean.rstrip().endswith(",")
-                suffix = "," if needs_comma else ""
-                ul_lines.append(f"{entry_clean}{suffix}")
-                if idx < len(filtered_entries) - 1:
-                    ul_lines.append("")
-
-            ul_lines.append("},")
-            ul_write_count += len(filtered_entries)
-
-        ul_lines.append("}") # Close the UnitLib table
-
-        ul_path = os.path.join(self.root, "scripts", "datatables", "UnitLib.lua")
-
-        mission_tree_content = self._build_mission_tree_content(mission_list)
-        mission_tree_path = os.path.join(self.root, "scripts", "datatables", "missiontree.lua")
+        ul_write_count = 0
+        for group_idx in sorted(needed_positions):
+            opening, entries = self.unitlib_fragments[group_idx]
+            positions = sorted(needed_positions[group_idx])
+
+            ul_fragments.append(opening)
+            for idx, pos in enumerate(positions):
+                if idx:
+                    ul_fragments.append(BLOCK_SEP)
+                ul_fragments.append(entries[pos])
+            ul_fragments.append(GROUP_CLOSE)
+            ul_write_count += len(positions)
+
+        ul_fragments.append(UNITLIB_CLOSE) # Close the UnitLib table
+
+        ul_path = os.path.join(out_root, PATH_UNITLIB)
+
+        mission_tree_content, mission_tree_note = self._build_mission_tree_content(mission_list, trim_mission_tree)
+        mission_tree_path = os.path.join(out_root, PATH_MISSION_TREE)
+
+        outputs = [
+            ("VehicleClass.lua", vc_fragments),
+            ("UnitLib.lua", ul_fragments),
+            ("missiontree.lua", [_render(mission_tree_content)]),
+        ]
+
+        minify_report = []
+        if minify:
+            text_outputs = [
+                (label, b"".join(fragments).decode('utf-8').replace(os.linesep, "\n"))
+                for label, fragments in outputs
+            ]
+            minify_report = self._minify_outputs(text_outputs)
+            if isinstance(minify_report, str):
+                return minify_report
+            outputs = [(label, [_render(text)]) for label, text in text_outputs]
 
         try:
             os.makedirs(os.path.dirname(vc_path), exist_ok=True)
             os.makedirs(os.path.dirname(ul_path), exist_ok=True)
 
-            with open(vc_path, 'w', encoding='utf-8') as f:
-                f.write("\n\n".join(vc_lines))
-
-            with open(ul_path, 'w', encoding='utf-8') as f:
-                f.write("\n".join(ul_lines))
-
-            with open(mission_tree_path, 'w', encoding='utf-8') as f:
-                f.write(mission_tree_content)
+            for out_path, (_, fragments) in zip((vc_path, ul_path, mission_tree_path), outputs):
+                with open(out_path, 'wb') as f:
+                    f.writelines(fragments)
 
         except Exception as e:
             return f"Error writing Output: {e}"
 
-        return (
+        result = (
             "Success! Generated:\n"
             f"VehicleClass: {vc_write_count} units\n"
             f"UnitLib: {ul_write_count} entries\n"
             f"missiontree.lua with {len(mission_list)} selected mission(s)"
         )
-
-    def _build_mission_tree_content(self, mission_list):
+        if mission_tree_note:
+            result += f"\n{mission_tree_note}"
+        if minify_report:
+            result += "\n\nMinified:\n" + "\n".join(minify_report)
+        return result
+
+    def _build_mission_tree_content(self, mission_list, trim=False):
+        """Returns (missiontree.lua content, report note or "")."""
         lines = [MASTER_TREE_PREAMBLE.strip(), ""]
+        note = ""
 
         if self.mission_groups_raw:
-            lines.append(self.mission_groups_raw.strip())
+            groups_block = self.mission_groups_raw.strip()
         else:
-            lines.append('MissionTree["missionGroups"] = {}')
+            groups_block = 'MissionTree["missionGroups"] = {}'
+
+        if trim:
+            sp_missions = [m for m in mission_list if m.group != "Multiplayer & Skirmish"]
+            trimmed = self._build_singleplayer_groups(sp_missions)
+            if not sp_missions:
+                # Nothing to trim to: fall back to the untrimmed output rather than
+                # emptying the single-player menus (the {} fallback above is only
+                # used when the master tree has no missionGroups block at all)
+                note = "missiontree.lua: no single-player missions selected, kept full mission groups"
+            elif not trimmed:
+                note = "missiontree.lua: missing group template, kept full mission groups"
+            elif not self._validate_mission_groups(trimmed, sp_missions):
+                note = "missiontree.lua: trimmed mission groups failed validation, kept full mission groups"
+            else:
+                before = len(groups_block.encode('utf-8'))
+                after = len(trimmed.encode('utf-8'))
+                group_count = len(set(m.group for m in sp_missions))
+                note = (
+                    f"missiontree.lua trimmed to {group_count} group(s): "
+                    f"mission groups {before} -> {after} bytes (-{before - after})"
+                )
+                groups_block = trimmed
 
+        lines.append(groups_block)
         lines.append("")
 
         mp_missions = [m for m in mission_list if m.group == "Multiplayer & Skirmish"]
         mp_block = self._build_multiplayer_block(mp_missions)
         lines.append(mp_block.strip())
 
-        return "\n".join(lines)
+        return "\n".join(lines), note
+
+    def _validate_mission_groups(self, block, missions):
+        """Checks a rebuilt missionGroups block: it must tokenize, have balanced
+        brackets and contain the id of every mission it was built from."""
+        try:
+            tokens = tokenize_lua(block)
+        except LuaTokenError:
+            return False
+
+        pairs = {"}": "{", "]": "[", ")": "("}
+        stack = []
+        for tok in tokens:
+            if tok in ("{", "[", "("):
+                stack.append(tok)
+            elif tok in pairs:
+                if not stack or stack.pop() != pairs[tok]:
+                    return False
+        if stack:
+            return False
+
+        token_set = set(tokens)
+        return all(f'"{m.id}"' in token_set or f"'{m.id}'" in token_set for m in missions)
 
     def _build_singleplayer_groups(self, missions):
         if not missions:
@@ -601,7 +1000,11 @@ class BSPParser:
 
         lines = ['MissionTree["missionGroups"] = {']
 
-        for group_name, group_missions in grouped.items():
+        # Keep the master tree's group order rather than the selection order
+        group_order = {name: idx for idx, name in enumerate(self.group_templates)}
+        ordered_groups = sorted(grouped.items(), key=lambda item: group_order.get(item[0], len(group_order)))
+
+        for group_name, group_missions in ordered_groups:
             template = self.group_templates.get(group_name)
             if not template:
                 # If the template is missing, we cannot safely rebuild the block.
@@ -647,3 +1050,104 @@ class BSPParser:
             return self.multi_block_raw.strip()
 
         return 'MissionTree["multiMissionInfos"] = {}'
+
+
+class OutputSizeTracker:
+    """Byte-exact size of the default (unminified, untrimmed) loader output.
+
+    Units and missions are added and removed one at a time and each call
+    only adjusts the sizes by that item's pre-rendered fragments, using the
+    same fragments, heads and separators generate_for_missions writes.
+    """
+
+    def __init__(self, parser):
+        self.parser = parser
+        self.vc_units = 0
+        self.ul_entries = 0
+        self._group_counts = {}
+        self._missions = []
+        self._mp_missions = []
+
+        empty_label = ""
+        self.vc_bytes = len(parser._vc_head(empty_label))
+        self.ul_bytes = len(parser._ul_head(empty_label)) + len(UNITLIB_CLOSE)
+        self.label_bytes = 0
+
+        empty_mp_block = len(_render(parser._build_multiplayer_block([]).strip()))
+        tree_content, _ = parser._build_mission_tree_content([])
+        self._tree_fixed_bytes = len(_render(tree_content)) - empty_mp_block
+        self.mp_bytes = empty_mp_block
+
+        for vc_id in parser.always_include_ids:
+            self._add_unitlib(vc_id)
+
+    @property
+    def mission_tree_bytes(self):
+        return self._tree_fixed_bytes + self.mp_bytes
+
+    @property
+    def vehicleclass_file_bytes(self):
+        return self.vc_bytes + self.label_bytes
+
+    @property
+    def unitlib_file_bytes(self):
+        return self.ul_bytes + self.label_bytes
+
+    @property
+    def total_bytes(self):
+        return self.vehicleclass_file_bytes + self.unitlib_file_bytes + self.mission_tree_bytes
+
+    def _add_unitlib(self, vc_id):
+        parser = self.parser
+        for group_idx, pos in parser.unitlib_index.get(vc_id, ()):
+            opening, entries = parser.unitlib_fragments[group_idx]
+            count = self._group_counts.get(group_idx, 0)
+            self._group_counts[group_idx] = count + 1
+            self.ul_bytes += len(entries[pos]) + (len(BLOCK_SEP) if count else len(opening) + len(GROUP_CLOSE))
+            self.ul_entries += 1
+
+    def _remove_unitlib(self, vc_id):
+        parser = self.parser
+        for group_idx, pos in parser.unitlib_index.get(vc_id, ()):
+            opening, entries = parser.unitlib_fragments[group_idx]
+            count = self._group_counts[group_idx] - 1
+            if count:
+                self._group_counts[group_idx] = count
+            else:
+                del self._group_counts[group_idx]
+            self.ul_bytes -= len(entries[pos]) + (len(BLOCK_SEP) if count else len(opening) + len(GROUP_CLOSE))
+            self.ul_entries -= 1
+
+    def add_unit(self, uid):
+        parser = self.parser
+        if parser._emits_vehicleclass(uid):
+            self.vc_units += 1
+            self.vc_bytes += len(BLOCK_SEP) + len(parser._vc_fragment(uid))
+        if uid not in parser.always_include_ids:
+            self._add_unitlib(uid)
+
+    def remove_unit(self, uid):
+        parser = self.parser
+        if parser._emits_vehicleclass(uid):
+            self.vc_units -= 1
+            self.vc_bytes -= len(BLOCK_SEP) + len(parser._vc_fragment(uid))
+        if uid not in parser.always_include_ids:
+            self._remove_unitlib(uid)
+
+    def _update_missions(self):
+        # The label and the multiplayer block are both small and rebuilt whole
+        parser = self.parser
+        self.label_bytes = len(_render(parser._mission_label(self._missions)))
+        self.mp_bytes = len(_render(parser._build_multiplayer_block(self._mp_missions).strip()))
+
+    def add_mission(self, mission):
+        self._missions.append(mission)
+        if mission.group == "Multiplayer & Skirmish":
+            self._mp_missions.append(mission)
+        self._update_missions()
+
+    def remove_mission(self, mission):
+        self._missions.remove(mission)
+        if mission in self._mp_missions:
+            self._mp_missions.remove(mission)
+        self._update_missions()
@@ -0,0 +1,190 @@
+# bsp_rotation.py
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from bsp_data import OUTPUT_PATHS
+
+
+class RotationScheduler:
+    """Pre-generates upcoming loaders for a mission rotation.
+
+    `rotation` is an ordered list of slots, each slot being the mission list
+    for one match; it wraps around when the end is reached. The next
+    `lookahead` slots are generated in the background into their own staging
+    directories (same layout as the game directory). `advance()` then swaps
+    the staged VehicleClass.lua/UnitLib.lua/missiontree.lua into the game
+    directory: every file is first copied next to its target, and only once
+    all three copies exist are they renamed into place with os.replace, so the
+    game never sees a half-written file and the window in which old and new
+    files are mixed is three renames long.
+
+    At most `keep_staged` staged sets are kept on disk; sets that have already
+    been swapped in are removed first, and `shutdown()` removes the rest.
+
+    A slot whose generate fails stays next in line, so the same error is
+    reported again on the next `advance()`; `advance(skip_failed=True)`
+    instead moves on to the first following slot that generates.
+    """
+
+    def __init__(self, parser, rotation, staging_dir, lookahead=2, keep_staged=4, minify=False,
+                 trim_mission_tree=False):
+        if not rotation:
+            raise ValueError("rotation must contain at least one slot")
+        for index, slot in enumerate(rotation):
+            if not slot:
+                raise ValueError(f"rotation slot {index} has no missions")
+        if lookahead < 1:
+            raise ValueError("lookahead must be at least 1")
+
+        self.parser = parser
+        self.rotation = [list(slot) for slot in rotation]
+        self.staging_dir = staging_dir
+        self.lookahead = lookahead
+        self.keep_staged = max(keep_staged, lookahead + 1)
+        self.minify = minify
+        self.trim_mission_tree = trim_mission_tree
+
+        self.position = -1  # step currently live in the game directory
+        self._staged = {}  # step -> Future resolving to the generate result
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bsp-rotation")
+
+    def _slot(self, step):
+        return self.rotation[step % len(self.rotation)]
+
+    def _stage_path(self, step):
+        return os.path.join(self.staging_dir, f"step-{step:06d}")
+
+    def _generate(self, step):
+        stage_path = self._stage_path(step)
+        if os.path.isdir(stage_path):
+            shutil.rmtree(stage_path)
+        return self.parser.generate_for_missions(
+            self._slot(step), minify=self.minify, output_root=stage_path,
+            trim_mission_tree=self.trim_mission_tree,
+        )
+
+    def prefetch(self):
+        """Queues background generation for the next `lookahead` steps."""
+        with self._lock:
+            for step in range(self.position + 1, self.position + 1 + self.lookahead):
+                if step not in self._staged:
+                    self._staged[step] = self._executor.submit(self._generate, step)
+
+    def start(self):
+        os.makedirs(self.staging_dir, exist_ok=True)
+        self.prefetch()
+
+    def _swap_in(self, stage_path):
+        targets = []
+        for rel_path in OUTPUT_PATHS:
+            dst = os.path.join(self.parser.root, rel_path)
+            tmp = dst + ".staging"
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            shutil.copyfile(os.path.join(stage_path, rel_path), tmp)
+            targets.append((tmp, dst))
+
+        for tmp, dst in targets:
+            os.replace(tmp, dst)
+
+    def _prune(self):
+        with self._lock:
+            steps = sorted(self._staged)
+            excess = len(steps) - self.keep_staged
+            for step in steps:
+                # Always keep the live set and everything still upcoming
+                if excess <= 0 or step >= self.position:
+                    break
+                future = self._staged.pop(step)
+                if future.done():
+                    shutil.rmtree(self._stage_path(step), ignore_errors=True)
+                excess -= 1
+
+    def _result(self, step):
+        with self._lock:
+            future = self._staged.get(step)
+            if future is None:
+                future = self._executor.submit(self._generate, step)
+                self._staged[step] = future
+
+        try:
+            res = future.result()
+        except Exception as e:
+            res = f"Error generating step {step}: {e}"
+        if "Error" in res:
+            # Drop the failed set so the next attempt generates it again
+            with self._lock:
+                self._staged.pop(step, None)
+            shutil.rmtree(self._stage_path(step), ignore_errors=True)
+        return res
+
+    def advance(self, skip_failed=False):
+        """Makes the next slot live. Returns the generate result string.
+
+        With skip_failed, slots whose generate fails are passed over (each at
+        most once) until one succeeds; their errors are printed and the
+        skipped steps listed in the result.
+        """
+        next_step = self.position + 1
+        res = self._result(next_step)
+        skipped = []
+        while "Error" in res and skip_failed and len(skipped) < len(self.rotation) - 1:
+            print(f"Rotation: skipping step {next_step}: {res}")
+            skipped.append(next_step)
+            next_step += 1
+            res = self._result(next_step)
+        if "Error" in res:
+            return res
+
+        try:
+            self._swap_in(self._stage_path(next_step))
+        except Exception as e:
+            return f"Error swapping in loader: {e}"
+
+        self.position = next_step
+        self.prefetch()
+        self._prune()
+
+        label = ", ".join(m.name for m in self._slot(next_step))
+        res = f"Success! Now live (step {next_step}): {label}"
+        if skipped:
+            res += f" (skipped failed step(s): {', '.join(map(str, skipped))})"
+        return res
+
+    def status(self):
+        with self._lock:
+            staged = sorted(self._staged.items())
+        lines = [f"Live step: {self.position}"]
+        for step, future in staged:
+            if not future.done():
+                state = "generating"
+            elif future.exception() is not None or "Error" in future.result():
+                state = "failed"
+            else:
+                state = "ready"
+            label = ", ".join(m.name for m in self._slot(step))
+            lines.append(f"step {step} [{state}]: {label}")
+        return "\n".join(lines)
+
+    def shutdown(self):
+        """Stops background generation and removes this scheduler's staged sets.
+
+        Queued look-ahead generates that have not started are cancelled; a
+        generate already running is waited for so its directory can be removed.
+        """
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            self._staged.clear()
+        try:
+            names = os.listdir(self.staging_dir)
+        except OSError:
+            return
+        for name in names:
+            if name.startswith("step-"):
+                shutil.rmtree(os.path.join(self.staging_dir, name), ignore_errors=True)
+        try:
+            os.rmdir(self.staging_dir)
+        except OSError:
+            pass
@@ -0,0 +1,84 @@
+# bsp_scenes.py
+import os
+
+
+def _find_child_dir(parent, name, is_dir=True):
+    """Returns the entry of `parent` whose name matches `name` ignoring case."""
+    wanted = name.lower()
+    try:
+        with os.scandir(parent) as entries:
+            for entry in entries:
+                if entry.name.lower() == wanted and entry.is_dir() == is_dir:
+                    return entry.name
+    except OSError:
+        pass
+    return None
+
+
+def find_path_ignoring_case(game_root, rel_path):
+    """Looks rel_path up on disk one component at a time, ignoring case.
+
+    Returns the real relative path, or None. Used for single scenes that were
+    missing when the SceneIndex was built.
+    """
+    parts = [part for part in rel_path.replace('\\', '/').split('/') if part]
+    real = []
+    for i, part in enumerate(parts):
+        name = _find_child_dir(os.path.join(game_root, *real), part, is_dir=i < len(parts) - 1)
+        if name is None:
+            return None
+        real.append(name)
+    return os.path.join(*real) if real else None
+
+
+class SceneIndex:
+    """Case-insensitive index of every file under universe/Scenes.
+
+    Built with a single scandir walk. Mission scene paths written on Windows
+    often differ in case from the files on disk; resolve() maps such a path to
+    the real relative path in O(1).
+    """
+
+    def __init__(self, game_root):
+        self.root = game_root
+        self.files = {}  # lowercased "universe/scenes/..." -> real relative path
+
+        universe = _find_child_dir(game_root, "universe")
+        scenes = universe and _find_child_dir(os.path.join(game_root, universe), "Scenes")
+        if not scenes:
+            return
+
+        pending = [(os.path.join(universe, scenes), os.path.join(game_root, universe, scenes))]
+        while pending:
+            rel_dir, abs_dir = pending.pop()
+            try:
+                with os.scandir(abs_dir) as entries:
+                    # Sorted so case collisions always resolve the same way
+                    for entry in sorted(entries, key=lambda e: e.name):
+                        rel_path = os.path.join(rel_dir, entry.name)
+                        if entry.is_dir():
+                            pending.append((rel_path, entry.path))
+                        else:
+                            self._add(rel_path)
+            except OSError:
+                continue
+
+    def _add(self, rel_path):
+        key = self._key(rel_path)
+        existing = self.files.get(key)
+        if existing is not None:
+            # Only possible on case-sensitive file systems; keep the first by name
+            print(f"Warning: scene files {existing} and {rel_path} differ only in case, using {existing}")
+            return
+        self.files[key] = rel_path
+
+    @staticmethod
+    def _key(rel_path):
+        return rel_path.replace('\\', '/').replace(os.sep, '/').lower()
+
+    def resolve(self, rel_path):
+        """Returns the on-disk relative path for rel_path, or None."""
+        return self.files.get(self._key(rel_path))
+
+    def __len__(self):
+        return len(self.files)
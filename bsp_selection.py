@@ -0,0 +1,101 @@
+# bsp_selection.py
+from bsp_parser import OutputSizeTracker
+
+
+class SelectionModel:
+    """Keeps the required-unit union of the selected missions up to date.
+
+    Every selected mission contributes one reference to each unit in its
+    closure. A unit enters the union when its count goes 0 -> 1 and leaves it
+    on 1 -> 0, so adding or removing a mission only touches that mission's
+    closure. The loader statistics shown in the GUI (VehicleClass units,
+    UnitLib entries, output size of all three files) are adjusted on the
+    same transitions by an OutputSizeTracker instead of being recomputed.
+    """
+
+    def __init__(self, parser):
+        self.parser = parser
+        self.missions = []
+        self.ref_counts = {}
+        self.closures = {}
+        self.errors = {}
+
+        self.size = OutputSizeTracker(parser)
+
+    def add(self, mission):
+        """Adds a mission to the selection. Returns an error string or None.
+
+        A mission whose scene cannot be resolved is still selected (so the
+        generate step reports it), it simply contributes no units.
+        """
+        if mission in self.closures:
+            return None
+
+        unit_ids, err = self.parser._collect_required_ids(mission)
+        if err:
+            self.errors[mission] = err
+            unit_ids = frozenset()
+
+        self.missions.append(mission)
+        self.closures[mission] = unit_ids
+        self.size.add_mission(mission)
+
+        ref_counts = self.ref_counts
+        for unit_id in unit_ids:
+            count = ref_counts.get(unit_id, 0)
+            ref_counts[unit_id] = count + 1
+            if count == 0:
+                self.size.add_unit(unit_id)
+        return err
+
+    def remove(self, mission):
+        unit_ids = self.closures.pop(mission, None)
+        if unit_ids is None:
+            return
+
+        self.missions.remove(mission)
+        self.errors.pop(mission, None)
+        self.size.remove_mission(mission)
+
+        ref_counts = self.ref_counts
+        for unit_id in unit_ids:
+            count = ref_counts[unit_id] - 1
+            if count:
+                ref_counts[unit_id] = count
+            else:
+                del ref_counts[unit_id]
+                self.size.remove_unit(unit_id)
+
+    def clear(self):
+        for mission in list(self.missions):
+            self.remove(mission)
+
+    def __contains__(self, mission):
+        return mission in self.closures
+
+    @property
+    def required_ids(self):
+        return self.ref_counts.keys()
+
+    @property
+    def vc_units(self):
+        return self.size.vc_units
+
+    @property
+    def ul_entries(self):
+        return self.size.ul_entries
+
+    @property
+    def output_bytes(self):
+        """Total size of VehicleClass.lua, UnitLib.lua and missiontree.lua as a
+        default (unminified, untrimmed) generate would write them."""
+        return self.size.total_bytes
+
+    def summary(self):
+        text = (
+            f"{len(self.missions)} mission(s) | VehicleClass: {self.vc_units} units | "
+            f"UnitLib: {self.ul_entries} entries | output: {self.output_bytes / 1024:.1f} KB"
+        )
+        if self.errors:
+            text += f" | {len(self.errors)} mission(s) with errors"
+        return text
@@ -0,0 +1,448 @@
+# bsp_service.py
+"""Long-running loader service.
+
+Parses the game data once and answers JSON requests either over a Unix
+domain socket (one JSON object per line) or over localhost HTTP
+(POST /<op> with an application/json body; GET for read-only ops). Supported
+ops:
+
+    list_missions                       -> all missions
+    resolve   {"missions": [ids]}       -> required unit IDs and codes
+    estimate  {"missions": [ids]}       -> unit/UnitLib counts and output size
+    generate  {"missions": [ids], "minify": bool, "trim_mission_tree": bool}
+    rotation  {"rotation": [[ids], ...], "lookahead": n, "keep_staged": n,
+               "minify": bool, "trim_mission_tree": bool}
+                                        -> start pre-generating a mission rotation
+    advance   {"skip_failed": bool}     -> swap the next rotation slot in
+    rotation_status
+    reload                              -> force a re-parse
+    status
+
+Read-only requests run concurrently; generate is serialized because all
+loaders are written to the same output files. Requests read an immutable
+CatalogSnapshot. When any source file changes the data is re-parsed into a
+new snapshot and swapped in, so requests already in flight finish against
+the snapshot they started with.
+
+Rotations stage their loaders under the server's --staging-dir; clients
+cannot choose the path.
+
+Usage:
+    python bsp_service.py GAME_DIR [--socket PATH | --port N] [--staging-dir PATH]
+"""
+import argparse
+import itertools
+import json
+import os
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bsp_data import (
+    PATH_ALWAYS_INCLUDE,
+    PATH_GLOBAL_ENUMS,
+    PATH_MASTER_LUA,
+    PATH_MASTER_MISSION_TREE,
+    PATH_MASTER_UNITLIB,
+)
+from bsp_parser import BSPParser
+from bsp_rotation import RotationScheduler
+from bsp_selection import SelectionModel
+from bsp_snapshot import CatalogSnapshot, SnapshotHolder
+
+SOURCE_PATHS = (
+    PATH_ALWAYS_INCLUDE,
+    PATH_GLOBAL_ENUMS,
+    PATH_MASTER_LUA,
+    PATH_MASTER_UNITLIB,
+    PATH_MASTER_MISSION_TREE,
+)
+
+OPS = (
+    "list_missions", "resolve", "estimate", "generate", "rotation", "advance",
+    "rotation_status", "reload", "status",
+)
+
+# HTTP GET may only run ops that change nothing
+HTTP_GET_OPS = ("list_missions", "rotation_status", "status")
+HTTP_ALLOWED_HOSTS = ("127.0.0.1", "localhost")
+
+DEFAULT_SOCKET_PATH = "/tmp/bsp_loader.sock"
+DEFAULT_STAGING_DIR = "/tmp/bsp_rotation"
+
+
+def load_parser(game_dir):
+    """Runs the same load sequence as the GUI. Returns (parser, error)."""
+    parser = BSPParser(game_dir)
+
+    # AlwaysInclude and UnitLib are optional, exactly as in the GUI
+    res = parser.load_always_include(os.path.join(game_dir, PATH_ALWAYS_INCLUDE))
+    if "Error" in res:
+        print("AlwaysInclude Load Warning:", res)
+
+    res = parser.load_global_enums(os.path.join(game_dir, PATH_GLOBAL_ENUMS))
+    if "Error" in res:
+        return None, res
+
+    res = parser.load_master_vehicle_classes(os.path.join(game_dir, PATH_MASTER_LUA))
+    if "Error" in res:
+        return None, res
+
+    res = parser.load_master_unitlib(os.path.join(game_dir, PATH_MASTER_UNITLIB))
+    if "Error" in res:
+        print("UnitLib Load Warning:", res)
+
+    res = parser.load_missions(os.path.join(game_dir, PATH_MASTER_MISSION_TREE))
+    if "Error" in res:
+        return None, res
+
+    return parser, None
+
+
+class LoaderService:
+    def __init__(self, game_dir, check_interval=1.0, staging_dir=DEFAULT_STAGING_DIR):
+        self.game_dir = game_dir
+        self.staging_dir = staging_dir
+        self.check_interval = check_interval
+        self.holder = SnapshotHolder()
+        self.loaded_at = 0.0
+        self._stamps = None
+        self._last_check = 0.0
+        self.rotation = None
+        self._rotation_ids = itertools.count()
+        self._reload_lock = threading.Lock()
+        self._generate_lock = threading.Lock()
+
+    def _source_stamps(self):
+        stamps = []
+        for rel_path in SOURCE_PATHS:
+            try:
+                st = os.stat(os.path.join(self.game_dir, rel_path))
+                stamps.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def reload(self):
+        with self._reload_lock:
+            return self._reload_locked()
+
+    def _reload_locked(self):
+        stamps = self._source_stamps()
+        parser, err = load_parser(self.game_dir)
+        if err:
+            return err
+        # Readers holding the old snapshot keep using it until they finish
+        self.holder.swap(CatalogSnapshot.from_parser(parser))
+        self._stamps = stamps
+        self._last_check = time.monotonic()
+        self.loaded_at = time.time()
+        return "Success"
+
+    def current(self):
+        """Returns the live snapshot, re-parsing first if a source file changed.
+
+        Source files are stat'ed at most once per check_interval so warm
+        requests do not pay for the check. The check itself runs under the
+        reload lock, so concurrent requests arriving on a stale interval
+        wait for one re-parse instead of each starting their own.
+        """
+        now = time.monotonic()
+        snapshot = self.holder.current
+        if snapshot is not None and now - self._last_check < self.check_interval:
+            return snapshot, None
+
+        with self._reload_lock:
+            # Another request may have checked (and reloaded) while we waited
+            if self.holder.current is not None and now - self._last_check < self.check_interval:
+                return self.holder.current, None
+
+            self._last_check = time.monotonic()
+            if self.holder.current is None or self._source_stamps() != self._stamps:
+                err = self._reload_locked()
+                if err != "Success" and self.holder.current is None:
+                    return None, err
+            return self.holder.current, None
+
+    def handle(self, request):
+        op = request.get("op")
+        if op not in OPS:
+            return {"ok": False, "error": f"Error: Unknown op {op!r}"}
+
+        if op == "reload":
+            res = self.reload()
+            return {"ok": res == "Success", "result": res}
+
+        snapshot, err = self.current()
+        if err:
+            return {"ok": False, "error": err}
+        parser = snapshot.reader()
+
+        if op == "status":
+            return {
+                "ok": True,
+                "game_dir": self.game_dir,
+                "loaded_at": self.loaded_at,
+                "missions": len(parser.missions),
+                "units": len(parser.master_units),
+            }
+
+        if op == "rotation":
+            return self._start_rotation(snapshot, request)
+
+        if op == "advance":
+            # Swapping a slot in rewrites the same files generate writes
+            with self._generate_lock:
+                if self.rotation is None:
+                    return {"ok": False, "error": "Error: No rotation set"}
+                res = self.rotation.advance(skip_failed=bool(request.get("skip_failed")))
+            return {"ok": "Error" not in res, "result": res}
+
+        if op == "rotation_status":
+            if self.rotation is None:
+                return {"ok": False, "error": "Error: No rotation set"}
+            return {"ok": True, "result": self.rotation.status()}
+
+        if op == "list_missions":
+            return {
+                "ok": True,
+                "missions": [
+                    {
+                        "id": m.id,
+                        "name": m.name,
+                        "group": m.group,
+                        "scn_path": m.scn_path,
+                        # Scenes found after load are only known once a request used them
+                        "scene_found": m.scene_found or m.scn_path in parser.late_scenes,
+                    }
+                    for m in parser.missions
+                ],
+            }
+
+        mission_ids = request.get("missions")
+        if mission_ids is not None and not isinstance(mission_ids, list):
+            return {"ok": False, "error": "Error: Bad request: missions must be a list of mission ids"}
+        if not mission_ids:
+            return {"ok": False, "error": "Error: No missions provided"}
+        missions, err = snapshot.find_missions(mission_ids)
+        if err:
+            return {"ok": False, "error": err}
+
+        if op == "resolve":
+            combined_ids = set()
+            for mission in missions:
+                mission_ids, err = parser._collect_required_ids(mission)
+                if err:
+                    return {"ok": False, "error": err}
+                combined_ids.update(mission_ids)
+            return {
+                "ok": True,
+                "unit_ids": sorted(combined_ids),
+                "codes": sorted(parser.master_units[uid].code for uid in combined_ids if uid in parser.master_units),
+            }
+
+        if op == "estimate":
+            selection = SelectionModel(parser)
+            for mission in missions:
+                err = selection.add(mission)
+                if err:
+                    return {"ok": False, "error": err}
+            return {
+                "ok": True,
+                "vehicleclass_units": selection.vc_units,
+                "unitlib_entries": selection.ul_entries,
+                "output_bytes": selection.output_bytes,
+                "vehicleclass_bytes": selection.size.vehicleclass_file_bytes,
+                "unitlib_bytes": selection.size.unitlib_file_bytes,
+                "missiontree_bytes": selection.size.mission_tree_bytes,
+            }
+
+        if op == "generate":
+            with self._generate_lock:
+                res = parser.generate_for_missions(
+                    missions,
+                    minify=bool(request.get("minify")),
+                    trim_mission_tree=bool(request.get("trim_mission_tree")),
+                )
+            return {"ok": "Error" not in res, "result": res}
+
+    def _start_rotation(self, snapshot, request):
+        """Replaces the current rotation with the one in the request.
+
+        The scheduler generates from the snapshot that is live now; send the
+        rotation again after a reload to stage slots from the new data.
+        """
+        if "staging_dir" in request:
+            return {"ok": False, "error": "Error: Bad request: the staging directory is set by the server"}
+
+        slots = request.get("rotation")
+        if not isinstance(slots, list) or not all(isinstance(slot, list) for slot in slots):
+            return {"ok": False, "error": "Error: Bad request: rotation must be a list of mission id lists"}
+
+        rotation = []
+        for slot in slots:
+            missions, err = snapshot.find_missions(slot)
+            if err:
+                return {"ok": False, "error": err}
+            rotation.append(missions)
+
+        try:
+            scheduler = RotationScheduler(
+                snapshot.reader(),
+                rotation,
+                # Each rotation gets its own directory under the server's root
+                os.path.join(self.staging_dir, f"rotation-{next(self._rotation_ids)}"),
+                lookahead=int(request.get("lookahead", 2)),
+                keep_staged=int(request.get("keep_staged", 4)),
+                minify=bool(request.get("minify")),
+                trim_mission_tree=bool(request.get("trim_mission_tree")),
+            )
+        except (TypeError, ValueError) as e:
+            return {"ok": False, "error": f"Error: Bad request: {e}"}
+
+        with self._generate_lock:
+            previous, self.rotation = self.rotation, scheduler
+            scheduler.start()
+        # The old scheduler stages in its own directory, so it can finish and
+        # clean up without holding up advance/generate on the new one
+        if previous is not None:
+            previous.shutdown()
+        return {"ok": True, "result": f"Success! Rotation of {len(rotation)} slot(s) started"}
+
+    def handle_raw(self, raw):
+        started = time.perf_counter()
+        try:
+            request = json.loads(raw)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+            response = self.handle(request)
+        except ValueError as e:
+            response = {"ok": False, "error": f"Error: Bad request: {e}"}
+        except Exception as e:
+            response = {"ok": False, "error": f"Error: {e}"}
+        response["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return json.dumps(response).encode("utf-8")
+
+
+class _UnixRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            self.wfile.write(self.server.service.handle_raw(line) + b"\n")
+            self.wfile.flush()
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _HTTPRequestHandler(BaseHTTPRequestHandler):
+    """Localhost-only JSON endpoint.
+
+    Browsers may send simple (no preflight) cross-origin requests to
+    localhost, so any request carrying an Origin header or a Host other than
+    127.0.0.1/localhost is refused, POST bodies must be application/json
+    (which forces a preflight this server never answers), and GET only runs
+    read-only ops.
+    """
+
+    def _reply(self, body, status=200):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _refuse(self, status, error):
+        self._reply(json.dumps({"ok": False, "error": f"Error: {error}"}).encode("utf-8"), status)
+
+    def _check_request(self):
+        """Returns an error string if the request must be refused, else None."""
+        if self.headers.get("Origin") is not None:
+            return "Cross-origin requests are not accepted"
+        host = (self.headers.get("Host") or "").rsplit(":", 1)[0].lower()
+        if host not in HTTP_ALLOWED_HOSTS:
+            return f"Host {host!r} is not accepted"
+        return None
+
+    def do_GET(self):
+        err = self._check_request()
+        if err:
+            return self._refuse(403, err)
+        op = self.path.strip("/") or "status"
+        if op not in HTTP_GET_OPS:
+            return self._refuse(405, f"{op} requires a POST with a JSON body")
+        self._reply(self.server.service.handle_raw(json.dumps({"op": op})))
+
+    def do_POST(self):
+        err = self._check_request()
+        if err:
+            return self._refuse(403, err)
+        content_type = (self.headers.get("Content-Type") or "").split(";", 1)[0].strip().lower()
+        if content_type != "application/json":
+            return self._refuse(415, "Content-Type must be application/json")
+
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b"{}"
+        try:
+            request = json.loads(body)
+        except ValueError:
+            request = None
+        if isinstance(request, dict):
+            request.setdefault("op", self.path.strip("/"))
+            body = json.dumps(request)
+        self._reply(self.server.service.handle_raw(body))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_unix(service, socket_path=DEFAULT_SOCKET_PATH):
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = _UnixServer(socket_path, _UnixRequestHandler)
+    server.service = service
+    print(f"Serving on unix socket {socket_path}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def serve_http(service, port):
+    server = ThreadingHTTPServer(("127.0.0.1", port), _HTTPRequestHandler)
+    server.service = service
+    print(f"Serving on http://127.0.0.1:{port}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Warm BSP mission loader service")
+    arg_parser.add_argument("game_dir", help="Battlestations Pacific directory")
+    group = arg_parser.add_mutually_exclusive_group()
+    group.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Unix socket path")
+    group.add_argument("--port", type=int, help="Serve localhost HTTP on this port instead")
+    arg_parser.add_argument("--staging-dir", default=DEFAULT_STAGING_DIR,
+                            help="Directory rotations stage upcoming loaders in")
+    args = arg_parser.parse_args()
+
+    service = LoaderService(args.game_dir, staging_dir=args.staging_dir)
+    res = service.reload()
+    if res != "Success":
+        raise SystemExit(res)
+
+    if args.port:
+        serve_http(service, args.port)
+    else:
+        serve_unix(service, args.socket)
+
+
+if __name__ == "__main__":
+    main()
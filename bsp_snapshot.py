@@ -0,0 +1,222 @@
+# bsp_snapshot.py
+import os
+import pickle
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+
+from bsp_parser import BSPParser, _render, render_unitlib_fragments
+
+# Immutable stand-ins for UnitDef / MissionDef. They expose the same attribute
+# names, so BSPParser's generation code reads them unchanged.
+FrozenUnit = namedtuple("FrozenUnit", "unit_id name code unit_type lua_content")
+FrozenMission = namedtuple("FrozenMission", "id name scn_path group raw_block scene_found", defaults=(True,))
+
+# Parser attributes captured by a snapshot (everything generation reads)
+_STATE_FIELDS = (
+    "root", "enums", "master_units", "master_unitlib", "unitlib_groups",
+    "unitlib_header", "missions", "non_unit_lua", "always_include_lua",
+    "always_include_ids", "group_templates", "mission_groups_raw",
+    "multi_template", "multi_block_raw", "dependency_mode", "dependency_rules",
+    "vc_fragments", "unitlib_fragments", "unitlib_index",
+)
+
+
+class CatalogSnapshot:
+    """Read-only copy of everything a loaded BSPParser knows.
+
+    All containers are frozen (mapping proxies, tuples, frozensets), so one
+    snapshot can be read from any number of threads. `reader()` returns a
+    BSPParser bound to the frozen data for running closures and generates;
+    it only adds its own caches on top.
+
+    For worker processes, `save()` writes the snapshot once to a file and
+    each worker unpickles it with `load()` (see `init_worker`), so tasks only
+    carry mission IDs instead of the Lua text. Every worker still holds its
+    own full copy of the catalog; the file only saves re-parsing the game
+    data per worker. A reload builds a new snapshot; swap it in with
+    `SnapshotHolder.swap()`.
+    """
+
+    __slots__ = _STATE_FIELDS + ("_reader", "_reader_lock")
+
+    def __init__(self, state):
+        freeze = MappingProxyType
+        setattr_ = object.__setattr__
+        setattr_(self, "root", state["root"])
+        setattr_(self, "enums", freeze(dict(state["enums"])))
+        setattr_(self, "master_units", freeze({
+            uid: FrozenUnit(u.unit_id, u.name, u.code, u.unit_type, u.lua_content)
+            for uid, u in state["master_units"].items()
+        }))
+        setattr_(self, "master_unitlib", freeze({
+            uid: tuple(entries) for uid, entries in state["master_unitlib"].items()
+        }))
+        setattr_(self, "unitlib_groups", tuple(
+            freeze({"header": g["header"], "entries": tuple(tuple(e) for e in g["entries"])})
+            for g in state["unitlib_groups"]
+        ))
+        setattr_(self, "unitlib_header", state["unitlib_header"])
+        setattr_(self, "missions", tuple(
+            FrozenMission(m.id, m.name, m.scn_path, m.group, m.raw_block, m.scene_found)
+            for m in state["missions"]
+        ))
+        setattr_(self, "non_unit_lua", tuple(state["non_unit_lua"]))
+        setattr_(self, "always_include_lua", state["always_include_lua"])
+        setattr_(self, "always_include_ids", frozenset(state["always_include_ids"]))
+        setattr_(self, "group_templates", freeze({
+            name: freeze(dict(t)) for name, t in state["group_templates"].items()
+        }))
+        setattr_(self, "mission_groups_raw", state["mission_groups_raw"])
+        setattr_(self, "multi_template", freeze(dict(state["multi_template"])))
+        setattr_(self, "multi_block_raw", state["multi_block_raw"])
+        setattr_(self, "dependency_mode", state["dependency_mode"])
+        setattr_(self, "dependency_rules", tuple(state["dependency_rules"]))
+        setattr_(self, "vc_fragments", freeze(dict(state["vc_fragments"])))
+        setattr_(self, "unitlib_fragments", tuple(
+            (opening, tuple(entries)) for opening, entries in state["unitlib_fragments"]
+        ))
+        setattr_(self, "unitlib_index", freeze({
+            vc_id: tuple(positions) for vc_id, positions in state["unitlib_index"].items()
+        }))
+        setattr_(self, "_reader", None)
+        setattr_(self, "_reader_lock", threading.Lock())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CatalogSnapshot is immutable")
+
+    @classmethod
+    def from_parser(cls, parser):
+        return cls({name: getattr(parser, name) for name in _STATE_FIELDS})
+
+    def _plain_state(self):
+        """Converts the frozen containers back to picklable builtins."""
+        return {
+            "root": self.root,
+            "enums": dict(self.enums),
+            "master_units": {uid: tuple(u) for uid, u in self.master_units.items()},
+            "unitlib_groups": [dict(g) for g in self.unitlib_groups],
+            "unitlib_header": self.unitlib_header,
+            "missions": [tuple(m) for m in self.missions],
+            "non_unit_lua": self.non_unit_lua,
+            "always_include_lua": self.always_include_lua,
+            "always_include_ids": self.always_include_ids,
+            "group_templates": {name: dict(t) for name, t in self.group_templates.items()},
+            "mission_groups_raw": self.mission_groups_raw,
+            "multi_template": dict(self.multi_template),
+            "multi_block_raw": self.multi_block_raw,
+            "dependency_mode": self.dependency_mode,
+            "dependency_rules": self.dependency_rules,
+        }
+
+    def save(self, path):
+        """Serializes the snapshot to path (written atomically).
+
+        Everything derived from the unit and UnitLib Lua text (the rendered
+        fragments, the UnitLib index and master_unitlib) is left out so each
+        text is stored once; load() rebuilds it.
+        """
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self._plain_state(), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Loads a snapshot written by save()."""
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+
+        state["master_units"] = {uid: FrozenUnit(*u) for uid, u in state["master_units"].items()}
+        state["vc_fragments"] = {uid: _render(u.lua_content) for uid, u in state["master_units"].items()}
+
+        master_unitlib = {}
+        for group in state["unitlib_groups"]:
+            for vc_id, entry in group["entries"]:
+                master_unitlib.setdefault(vc_id, []).append(entry)
+        state["master_unitlib"] = master_unitlib
+        state["unitlib_fragments"], state["unitlib_index"] = render_unitlib_fragments(state["unitlib_groups"])
+        state["missions"] = [FrozenMission(*m) for m in state["missions"]]
+        return cls(state)
+
+    def reader(self):
+        """Returns a BSPParser that reads this snapshot's frozen data.
+
+        The reader is created once per snapshot and shared; its only mutable
+        state is the closure/dependency caches, which are safe to fill from
+        several threads.
+        """
+        if self._reader is None:
+            with self._reader_lock:
+                if self._reader is None:
+                    reader = BSPParser(self.root)
+                    for name in _STATE_FIELDS:
+                        setattr(reader, name, getattr(self, name))
+                    reader.set_dependency_mode(self.dependency_mode, self.dependency_rules)
+                    object.__setattr__(self, "_reader", reader)
+        return self._reader
+
+    def find_missions(self, mission_ids):
+        """Maps a list of mission IDs to missions. Returns (missions, error).
+
+        Repeated IDs are dropped (first occurrence kept), matching the GUI and
+        SelectionModel, which never select a mission twice.
+        """
+        if mission_ids is None:
+            mission_ids = ()
+        elif not isinstance(mission_ids, (list, tuple)):
+            return None, "Error: missions must be a list of mission ids"
+
+        by_id = {}
+        for m in self.missions:
+            by_id.setdefault(str(m.id), m)
+
+        missions = []
+        seen = set()
+        for mission_id in mission_ids:
+            mission = by_id.get(str(mission_id))
+            if mission is None:
+                return None, f"Error: Unknown mission id {mission_id}"
+            if mission.id not in seen:
+                seen.add(mission.id)
+                missions.append(mission)
+        return missions, None
+
+
+class SnapshotHolder:
+    """Holds the current snapshot; readers take a reference, reloads swap it."""
+
+    def __init__(self, snapshot=None):
+        self._snapshot = snapshot
+
+    @property
+    def current(self):
+        return self._snapshot
+
+    def swap(self, snapshot):
+        """Installs a new snapshot and returns the previous one."""
+        previous, self._snapshot = self._snapshot, snapshot
+        return previous
+
+
+# --- Worker process helpers (e.g. ProcessPoolExecutor initializer) ---
+
+_worker_snapshot = None
+
+
+def init_worker(snapshot_path):
+    global _worker_snapshot
+    _worker_snapshot = CatalogSnapshot.load(snapshot_path)
+
+
+def worker_generate(mission_ids, output_root, minify=False, trim_mission_tree=False):
+    """Generates a loader inside a worker initialized with init_worker()."""
+    if _worker_snapshot is None:
+        return "Error: worker has no snapshot loaded"
+
+    missions, err = _worker_snapshot.find_missions(mission_ids)
+    if err:
+        return err
+    return _worker_snapshot.reader().generate_for_missions(
+        missions, minify=minify, output_root=output_root, trim_mission_tree=trim_mission_tree
+    )
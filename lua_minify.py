@@ -0,0 +1,169 @@
+# lua_minify.py
+import re
+
+# Multi-character operators, longest first so the scanner always takes the
+# longest match ("..." before "..", ".." before ".").
+_LUA_OPERATORS = ("...", "..", "==", "~=", "<=", ">=", "::", "//", "<<", ">>")
+
+_NAME_RE = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+_NUMBER_RE = re.compile(
+    r'0[xX][0-9A-Fa-f]*(?:\.[0-9A-Fa-f]*)?(?:[pP][+-]?[0-9]+)?'
+    r'|(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?'
+)
+_LONG_BRACKET_RE = re.compile(r'\[(=*)\[')
+_WHITESPACE = " \t\r\n\f\v"
+
+# Characters that never merge with a neighbouring token, so no separator is
+# needed next to them ("[" is handled separately because "[[" / "[=" would
+# open a long bracket).
+_SELF_DELIMITING = set("{}(),;]")
+
+
+class LuaTokenError(ValueError):
+    pass
+
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == "_"
+
+
+def _is_ascii_digit(ch):
+    return "0" <= ch <= "9"
+
+
+def _long_bracket_end(text, idx):
+    """Returns the index just past the long bracket opened at idx, or -1 if
+    idx does not start a long bracket."""
+    match = _LONG_BRACKET_RE.match(text, idx)
+    if not match:
+        return -1
+    closing = "]" + match.group(1) + "]"
+    end = text.find(closing, match.end())
+    if end == -1:
+        raise LuaTokenError(f"Unterminated long bracket at offset {idx}")
+    return end + len(closing)
+
+
+def tokenize(text):
+    """Splits Lua source into tokens, dropping comments and whitespace.
+
+    Strings (quoted and long-bracket) are returned verbatim, so a token list
+    is a faithful description of what the Lua compiler will see.
+    """
+    tokens = []
+    idx = 0
+    length = len(text)
+
+    while idx < length:
+        ch = text[idx]
+
+        if ch in _WHITESPACE:
+            idx += 1
+            continue
+
+        if text.startswith("--", idx):
+            end = _long_bracket_end(text, idx + 2)
+            if end == -1:
+                end = text.find("\n", idx)
+                if end == -1:
+                    end = length
+            idx = end
+            continue
+
+        if ch == '"' or ch == "'":
+            end = idx + 1
+            while end < length and text[end] != ch:
+                if text[end] == "\\":
+                    end += 1
+                elif text[end] == "\n":
+                    raise LuaTokenError(f"Unfinished string at offset {idx}")
+                end += 1
+            if end >= length:
+                raise LuaTokenError(f"Unfinished string at offset {idx}")
+            tokens.append(text[idx:end + 1])
+            idx = end + 1
+            continue
+
+        if ch == "[":
+            end = _long_bracket_end(text, idx)
+            if end != -1:
+                tokens.append(text[idx:end])
+                idx = end
+                continue
+
+        if not ch.isascii():
+            # A leading BOM is kept as is; anything else outside a string or
+            # comment is not valid Lua
+            if idx == 0 and ch == "\ufeff":
+                tokens.append(ch)
+                idx += 1
+                continue
+            raise LuaTokenError(f"Unexpected character {ch!r} at offset {idx}")
+
+        if _is_ascii_digit(ch) or (ch == "." and idx + 1 < length and _is_ascii_digit(text[idx + 1])):
+            match = _NUMBER_RE.match(text, idx)
+            tokens.append(match.group(0))
+            idx = match.end()
+            continue
+
+        if ch.isalpha() or ch == "_":
+            match = _NAME_RE.match(text, idx)
+            tokens.append(match.group(0))
+            idx = match.end()
+            continue
+
+        for op in _LUA_OPERATORS:
+            if text.startswith(op, idx):
+                tokens.append(op)
+                idx += len(op)
+                break
+        else:
+            tokens.append(ch)
+            idx += 1
+
+    return tokens
+
+
+def _needs_separator(prev, nxt):
+    a, b = prev[-1], nxt[0]
+    if _is_word_char(a) and _is_word_char(b):
+        return True
+    if a == "[" and b in "[=":
+        return True
+    if b == "[":
+        return False
+    if a in _SELF_DELIMITING or b in _SELF_DELIMITING:
+        return False
+    if a in "'\"" or b in "'\"":
+        return False
+    # Numbers followed by "." (e.g. "1 .. x") and any two operator
+    # characters next to each other could fuse into a different token.
+    if b == "." and _NUMBER_RE.fullmatch(prev):
+        return True
+    if not _is_word_char(a) and not _is_word_char(b):
+        return True
+    if a == "." and b.isdigit():
+        return True
+    return False
+
+
+def minify(text):
+    """Strips comments and redundant whitespace from Lua source."""
+    tokens = tokenize(text)
+    if not tokens:
+        return ""
+
+    parts = [tokens[0]]
+    for prev, nxt in zip(tokens, tokens[1:]):
+        if _needs_separator(prev, nxt):
+            parts.append(" ")
+        parts.append(nxt)
+    return "".join(parts)
+
+
+def is_token_equivalent(original, minified):
+    """True when both sources tokenize to the same token stream."""
+    try:
+        return tokenize(original) == tokenize(minified)
+    except LuaTokenError:
+        return False